@@ -1,5 +1,65 @@
+import atexit
+import contextlib
 import datetime
+import functools
 import json  # 用於儲存和載入使用者資料 (可以替換為資料庫)
+import os
+import sys
+from dataclasses import asdict, dataclass
+from typing import Any
+
+try:
+    import orjson  # 以 C 實作的 JSON 函式庫，有安裝時優先使用
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj, pretty=False):
+    """將資料序列化為 UTF-8 JSON bytes，中文字不跳脫為 \\uXXXX；pretty 為 True 時輸出縮排格式 (除錯用)。"""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS：與標準 json 相同，非字串的 key 轉為字串而不是拋出例外
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(raw):
+    """將 JSON bytes 反序列化為資料。"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _intern(key):
+    """駐留字串 key，讓各處的字典查找共用同一個物件；非字串則原樣回傳。"""
+    return sys.intern(key) if isinstance(key, str) else key
+
+
+def _memoize_str(func):
+    """以 lru_cache 快取字串參數的結果；其他型別 (可能無法雜湊) 直接呼叫原函式，不經過快取。"""
+    cached = functools.lru_cache(maxsize=4096)(func)
+
+    @functools.wraps(func)
+    def wrapper(note_content):
+        if isinstance(note_content, str):
+            return cached(note_content)
+        return func(note_content)
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+@dataclass(slots=True)
+class Task:
+    """學習任務，deadline_ts 為預先計算的截止時間 epoch 秒數。"""
+    deadline: str
+    details: Any
+    completed: bool
+    deadline_ts: float
+
 
 class User:
     """使用者類別，儲存使用者的個人資訊和學習習慣。"""
@@ -8,7 +68,8 @@ class User:
         self.name = name
         self.learning_habits = {}  # 例如：偏好的筆記格式、專注時長等
         self.study_preferences = {} # 例如：希望加強的科目、題型
-        self.notes = {}           # 儲存筆記，key 可以是科目或主題
+        self.notes_ts = {}        # 儲存筆記時間戳記，key 可以是科目或主題
+        self.notes_content = {}   # 儲存筆記內容，與 notes_ts 依索引對應
         self.study_schedule = {}  # 儲存學習進度計畫
 
     def update_learning_habits(self, habit, value):
@@ -21,32 +82,39 @@ class User:
 
     def add_note(self, subject, content):
         """新增筆記。"""
-        if subject not in self.notes:
-            self.notes[subject] = []
-        self.notes[subject].append({"timestamp": datetime.datetime.now().isoformat(), "content": content})
+        subject = _intern(subject)
+        self.notes_ts.setdefault(subject, []).append(datetime.datetime.now().isoformat())
+        self.notes_content.setdefault(subject, []).append(content)
 
     def get_notes_by_subject(self, subject):
         """取得特定科目的所有筆記。"""
-        return self.notes.get(subject, [])
+        return [{"timestamp": ts, "content": content}
+                for ts, content in zip(self.notes_ts.get(subject, []), self.notes_content.get(subject, []))]
+
+    def get_latest_note(self, subject):
+        """取得特定科目最新一則筆記的內容，沒有筆記時回傳 None。"""
+        contents = self.notes_content.get(subject)
+        return contents[-1] if contents else None
+
+    def set_latest_note(self, subject, content):
+        """更新特定科目最新一則筆記的內容。"""
+        self.notes_content[subject][-1] = content
 
     def add_study_task(self, task, deadline, details=None):
         """新增學習任務到排程。"""
-        self.study_schedule[task] = {"deadline": deadline, "details": details, "completed": False}
+        self.study_schedule[task] = Task(deadline, details, False, datetime.datetime.fromisoformat(deadline).timestamp())
 
     def mark_task_completed(self, task):
         """標記學習任務為已完成。"""
         if task in self.study_schedule:
-            self.study_schedule[task]["completed"] = True
+            self.study_schedule[task].completed = True
 
     def get_upcoming_tasks(self):
         """取得未來的學習任務。"""
-        upcoming_tasks = {}
-        now = datetime.datetime.now()
-        for task, details in self.study_schedule.items():
-            deadline_dt = datetime.datetime.fromisoformat(details['deadline'])
-            if not details['completed'] and deadline_dt > now:
-                upcoming_tasks[task] = details
-        return upcoming_tasks
+        now = datetime.datetime.now().timestamp()
+        # study_schedule 也可能存放每日進度 (科目清單)，只挑出 Task
+        return {task: details for task, details in self.study_schedule.items()
+                if isinstance(details, Task) and not details.completed and details.deadline_ts > now}
 
     def to_dict(self):
         """將使用者資料轉換為字典，方便儲存。"""
@@ -55,8 +123,9 @@ class User:
             "name": self.name,
             "learning_habits": self.learning_habits,
             "study_preferences": self.study_preferences,
-            "notes": self.notes,
-            "study_schedule": self.study_schedule
+            "notes": {subject: self.get_notes_by_subject(subject) for subject in self.notes_ts},
+            "study_schedule": {key: asdict(value) if isinstance(value, Task) else value
+                               for key, value in self.study_schedule.items()}
         }
 
     @staticmethod
@@ -64,30 +133,53 @@ class User:
         """從字典建立使用者物件。"""
         user = User(data['user_id'], data['name'])
         user.learning_habits = data.get('learning_habits', {})
-        user.notes = data.get('notes', {})
-        user.study_schedule = data.get('study_schedule', {})
+        user.study_preferences = data.get('study_preferences', {})
+        for subject, note_list in data.get('notes', {}).items():
+            subject = _intern(subject)  # 從 JSON 載入的字串是新物件，需重新駐留
+            user.notes_ts[subject] = [n['timestamp'] for n in note_list]
+            user.notes_content[subject] = [n['content'] for n in note_list]
+        user.study_schedule = {_intern(key): value for key, value in data.get('study_schedule', {}).items()}
+        for key, value in user.study_schedule.items():
+            if isinstance(value, dict) and 'deadline' in value:
+                # 舊版資料沒有 deadline_ts，載入時補算
+                deadline_ts = value.get('deadline_ts')
+                if deadline_ts is None:
+                    deadline_ts = datetime.datetime.fromisoformat(value['deadline']).timestamp()
+                user.study_schedule[key] = Task(value['deadline'], value.get('details'), value.get('completed', False), deadline_ts)
         return user
 
 class NoteOrganizer:
     """筆記整理器類別，負責處理筆記的統整和結構化。"""
-    def summarize_note(self, note_content):
-        """使用 AI 模型總結筆記內容 (這裡只是 placeholder)。"""
+    @staticmethod
+    @_memoize_str
+    def summarize_note(note_content):
+        """使用 AI 模型總結筆記內容 (這裡只是 placeholder)。相同內容的結果會被快取。"""
         # TODO: 整合 AI 模型進行筆記摘要
         return f"【AI摘要】{note_content[:50]}..."
 
-    def structure_note(self, note_content):
-        """使用 AI 模型將筆記結構化 (這裡只是 placeholder)。"""
+    @staticmethod
+    def structure_note(note_content):
+        """使用 AI 模型將筆記結構化 (這裡只是 placeholder)。相同內容的結果會被快取。"""
+        main_points, keywords = NoteOrganizer._structure_note(note_content)
+        return {"main_points": list(main_points), "keywords": list(keywords)}
+
+    @staticmethod
+    @_memoize_str
+    def _structure_note(note_content):
+        """structure_note 的快取實作，以 tuple 儲存結果，避免呼叫端修改到快取內容。"""
         # TODO: 整合 AI 模型進行筆記結構化，例如提取關鍵字、建立層級結構
-        return {"main_points": [note_content[:30], note_content[30:60]], "keywords": [note_content[:10], note_content[20:30]]}
+        return (note_content[:30], note_content[30:60]), (note_content[:10], note_content[20:30])
 
-    def generate_knowledge_map(self, structured_notes):
+    @staticmethod
+    def generate_knowledge_map(structured_notes):
         """根據結構化筆記產生知識結構圖 (這裡只是 placeholder)。"""
         # TODO: 實作知識結構圖的生成邏輯，可能需要圖形資料庫或視覺化函式庫
         return {"nodes": list(structured_notes.keys()), "edges": []}
 
 class StudyScheduler:
     """學習排程器類別，負責根據使用者需求和學習習慣安排進度。"""
-    def plan_schedule(self, user, available_time, focused_time, important_subjects, exam_date=None, subjects_per_day=2):
+    @staticmethod
+    def plan_schedule(user, available_time, focused_time, important_subjects, exam_date=None, subjects_per_day=2):
         """根據使用者提供的資訊規劃學習進度。"""
         schedule = {}
         # 確保 available_time 不是空的
@@ -99,65 +191,83 @@ class StudyScheduler:
             print("警告：沒有重要的科目。")
             return schedule
 
+        if subjects_per_day < 1:
+            print("警告：每天學習的科目數至少要 1 個。")
+            return schedule
+
+        n_subjects = len(important_subjects)
+        subjects_per_day = min(subjects_per_day, n_subjects)
+        # 科目清單接兩次，每天輪替的科目就是一段連續切片，不必逐一取餘數
+        rotation = important_subjects + important_subjects
         daily_schedule = {}
-        for day, hours in available_time.items():
-            daily_schedule[day] = []
+        for day_idx, (day, hours) in enumerate(available_time.items()):
             if hours > 0:
-                if subjects_per_day > len(important_subjects):
-                    subjects_per_day = len(important_subjects)
                 time_per_subject = hours / subjects_per_day
-                for i in range(subjects_per_day):
-                    subject_index = (list(available_time.keys()).index(day) + i) % len(important_subjects)
-                    subject = important_subjects[subject_index]
-                    daily_schedule[day].append({subject: time_per_subject})
+                start = day_idx % n_subjects
+                daily_schedule[day] = [{subject: time_per_subject} for subject in rotation[start:start + subjects_per_day]]
             else:
-                 daily_schedule[day].append({"休息": 0})
+                daily_schedule[day] = [{"休息": 0}]
 
         schedule = daily_schedule
 
         if exam_date:
-            days_until_exam = (datetime.datetime.strptime(exam_date, '%Y-%m-%d') - datetime.datetime.now()).days
+            try:
+                exam_day = datetime.date.fromisoformat(exam_date)
+            except ValueError:
+                # fromisoformat 不接受未補零的日期 (例如 2025-6-5)，改用 strptime 解析
+                exam_day = datetime.datetime.strptime(exam_date, '%Y-%m-%d').date()
+            days_until_exam = (exam_day - datetime.date.today()).days
             schedule['複習'] = {"start_day": f"考前 {days_until_exam} 天"}
         return schedule
 
-    def suggest_review_schedule(self, notes):
-        """根據筆記內容建議複習進度 (這裡只是 placeholder)。"""
+    @staticmethod
+    def suggest_review_schedule(notes_ts):
+        """根據筆記時間戳記建議複習進度 (這裡只是 placeholder)。"""
         # TODO: 實作根據筆記內容和時間戳記建議複習的邏輯
         review_items = {}
-        for subject, note_list in notes.items():
-            # 簡單地建議複習最近的筆記
-            if note_list:
-                latest_note_time = max(n['timestamp'] for n in note_list)
-                review_items[subject] = f"建議複習 {datetime.datetime.fromisoformat(latest_note_time).strftime('%Y-%m-%d')} 的筆記"
+        for subject, timestamps in notes_ts.items():
+            # 簡單地建議複習最近的筆記；筆記依時間順序附加，最後一筆即為最新
+            if timestamps:
+                # isoformat() 的時間戳記開頭就是 YYYY-MM-DD，直接切片即可
+                review_items[subject] = f"建議複習 {timestamps[-1][:10]} 的筆記"
         return review_items
 
 class Personalizer:
     """個人化調整器類別，根據使用者習慣調整筆記格式和學習進度。"""
-    def adjust_note_format(self, note_content, preferred_format):
+    @staticmethod
+    def adjust_note_format(note_content, preferred_format):
         """根據使用者偏好調整筆記格式 (這裡只是簡單的範例)。"""
         if preferred_format == "bullet_points":
             return "- " + "\n- ".join(note_content.split('\n'))
         elif preferred_format == "mind_map_keywords":
             # TODO: 更複雜的格式轉換
-            structured_note = NoteOrganizer().structure_note(note_content) # 創建 NoteOrganizer 的實例
+            structured_note = NoteOrganizer.structure_note(note_content)
             if structured_note and 'keywords' in structured_note:
                 return f"【關鍵字】{', '.join(structured_note['keywords'])}"
             else:
                 return "【關鍵字】 無"
         return note_content
 
-    def adjust_schedule(self, study_schedule, user_habits):
+    @staticmethod
+    def adjust_schedule(study_schedule, user_habits):
         """根據使用者習慣調整學習進度 (這裡只是簡單的範例)。"""
-        adjusted_schedule = study_schedule.copy()
-        if user_habits.get("preferred_study_time") == "morning":
-            for day, subjects in adjusted_schedule.items():
-                if day != '複習':  # 確保我們不在處理複習的特殊情況
-                    for item in subjects:
-                        for subject, time in item.items():
-                            adjusted_schedule[day] = [{"[早上] " + k: v for k, v in item.items()} for item in subjects]
-                else:
-                    adjusted_schedule[day] = f"[早上] {adjusted_schedule[day]}"
-        return adjusted_schedule
+        if user_habits.get("preferred_study_time") != "morning":
+            return study_schedule
+        # 複習是特殊情況，不是科目清單
+        return {day: f"[早上] {subjects}" if day == '複習'
+                else [{f"[早上] {k}": v for k, v in item.items()} for item in subjects]
+                for day, subjects in study_schedule.items()}
+
+
+_dirty_apps = set()  # 有未寫回變更的 SmartNoteApp；寫回後即移除，不會讓沒有變更的實例無法回收
+
+
+@atexit.register
+def _flush_dirty_apps():
+    """程式結束時寫回所有 SmartNoteApp 尚未寫回的變更。"""
+    for app in list(_dirty_apps):
+        app.flush()
+
 
 class SmartNoteApp:
     """智慧筆記助手應用程式的核心類別。"""
@@ -167,12 +277,16 @@ class SmartNoteApp:
         self.study_scheduler = StudyScheduler() # 創建 StudyScheduler 的實例
         self.personalizer = Personalizer()   # 創建 Personalizer 的實例
         self.data_file = "user_data.json" # 用於簡單儲存使用者資料
+        self.pretty_json = False  # 除錯時可設為 True，以縮排格式儲存資料檔
+        self._dirty: set[str] = set()  # 有變更、尚未寫回檔案的使用者 ID
+        self._autosave = False  # 為 True 時每次變更都立即寫回檔案
+        self._in_batch = False  # 批次操作期間暫緩寫檔
 
     def register_user(self, user_id, name):
         """註冊新使用者。"""
         if user_id not in self.users:
             self.users[user_id] = User(user_id, name)
-            self.save_data()
+            self._mark_dirty(user_id)
             return self.users[user_id]
         return self.users[user_id]
 
@@ -192,7 +306,7 @@ class SmartNoteApp:
         user = self.get_user(user_id)
         if user:
             user.add_note(subject, content)
-            self.save_data()
+            self._mark_dirty(user_id)
 
     def get_notes(self, user_id, subject):
         """取得特定使用者的特定科目筆記。"""
@@ -202,26 +316,27 @@ class SmartNoteApp:
     def summarize_note(self, user_id, subject):
         """總結特定使用者的特定科目筆記 (這裡只總結最新的)。"""
         user = self.get_user(user_id)
-        if user and user.get_notes_by_subject(subject):
-            latest_note = user.get_notes_by_subject(subject)[-1]['content']
-            return self.note_organizer.summarize_note(latest_note)
-        return "沒有相關筆記。"
+        latest_note = user.get_latest_note(subject) if user else None
+        if latest_note is None:
+            return "沒有相關筆記。"
+        return self.note_organizer.summarize_note(latest_note)
 
     def get_structured_note(self, user_id, subject):
         """取得特定使用者特定科目結構化後的筆記 (這裡只結構化最新的)。"""
         user = self.get_user(user_id)
-        if user and user.get_notes_by_subject(subject):
-            latest_note = user.get_notes_by_subject(subject)[-1]['content']
-            return self.note_organizer.structure_note(latest_note)
-        return "沒有相關筆記。"
+        latest_note = user.get_latest_note(subject) if user else None
+        if latest_note is None:
+            return "沒有相關筆記。"
+        return self.note_organizer.structure_note(latest_note)
 
     def plan_study_schedule(self, user_id, available_time, focused_time, important_subjects, exam_date=None, subjects_per_day=2):
         """為使用者規劃學習進度。"""
         user = self.get_user(user_id)
         if user:
+            important_subjects = [_intern(subject) for subject in important_subjects]
             schedule = self.study_scheduler.plan_schedule(user, available_time, focused_time, important_subjects, exam_date, subjects_per_day)
             user.study_schedule = schedule
-            self.save_data()
+            self._mark_dirty(user_id)
             return schedule
         return {}
 
@@ -238,33 +353,32 @@ class SmartNoteApp:
     def get_review_suggestions(self, user_id):
         """取得使用者的複習建議。"""
         user = self.get_user(user_id)
-        return self.study_scheduler.suggest_review_schedule(user.notes) if user else {}
+        return self.study_scheduler.suggest_review_schedule(user.notes_ts) if user else {}
 
     def update_learning_habits(self, user_id, habit, value):
         """更新使用者的學習習慣。"""
         user = self.get_user(user_id)
         if user:
             user.update_learning_habits(habit, value)
-            self.save_data()
+            self._mark_dirty(user_id)
 
     def update_study_preferences(self, user_id, preference, value):
         """更新使用者的學習偏好。"""
         user = self.get_user(user_id)
         if user:
             user.update_study_preferences(preference, value)
-            self.save_data()
+            self._mark_dirty(user_id)
 
     def adjust_note_format(self, user_id, subject, preferred_format):
         """根據使用者偏好調整特定科目筆記的格式 (這裡只調整最新的)。"""
         user = self.get_user(user_id)
-        if user and user.get_notes_by_subject(subject):
-            latest_note_index = len(user.get_notes_by_subject(subject)) - 1
-            original_content = user.get_notes_by_subject(subject)[latest_note_index]['content']
-            formatted_content = self.personalizer.adjust_note_format(original_content, preferred_format)
-            user.get_notes_by_subject(subject)[latest_note_index]['content'] = formatted_content
-            self.save_data()
-            return formatted_content
-        return "沒有相關筆記。"
+        latest_note = user.get_latest_note(subject) if user else None
+        if latest_note is None:
+            return "沒有相關筆記。"
+        formatted_content = self.personalizer.adjust_note_format(latest_note, preferred_format)
+        user.set_latest_note(subject, formatted_content)
+        self._mark_dirty(user_id)
+        return formatted_content
 
     def adjust_study_schedule(self, user_id):
         """根據使用者習慣調整學習進度。"""
@@ -272,24 +386,80 @@ class SmartNoteApp:
         if user:
             adjusted_schedule = self.personalizer.adjust_schedule(user.study_schedule, user.learning_habits)
             user.study_schedule = adjusted_schedule
-            self.save_data()
+            self._mark_dirty(user_id)
             return adjusted_schedule
         return {}
 
+    def _mark_dirty(self, user_id):
+        """標記使用者資料已變更，等待 flush 時寫回。"""
+        self._dirty.add(user_id)
+        _dirty_apps.add(self)  # 在寫回前保持參照，程式結束時才能寫回變更
+        if self._autosave and not self._in_batch:
+            self.flush()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """批次操作：期間的變更不寫檔，結束時一次寫回。"""
+        was_in_batch = self._in_batch
+        self._in_batch = True
+        try:
+            yield self
+        finally:
+            self._in_batch = was_in_batch
+            if not was_in_batch:
+                self.flush()
+
+    def _mark_clean(self):
+        """變更皆已寫回，清除標記。"""
+        self._dirty.clear()
+        _dirty_apps.discard(self)
+
+    def _write_data(self, data):
+        """先寫入暫存檔再以 os.replace 取代，避免寫到一半時檔案損毀。"""
+        tmp_file = self.data_file + ".tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(data, self.pretty_json))
+            os.replace(tmp_file, self.data_file)
+            return True
+        except (IOError, TypeError, ValueError) as e:
+            print(f"儲存資料失敗: {e}")
+            with contextlib.suppress(OSError):
+                os.remove(tmp_file)  # 不留下寫到一半的暫存檔
+            return False
+
+    def flush(self):
+        """只將有變更的使用者資料寫回檔案。"""
+        if self._in_batch or not self._dirty:
+            return
+        try:
+            with open(self.data_file, 'rb') as f:
+                data = _loads(f.read())
+        except (OSError, json.JSONDecodeError):
+            data = None
+        if not isinstance(data, dict):
+            # 檔案不存在、無法讀取或內容不是物件時無從合併，改存完整快照，避免未變更的使用者被遺漏
+            self.save_data()
+            return
+        for user_id in self._dirty:
+            if user_id in self.users:
+                data[user_id] = self.users[user_id].to_dict()
+        if self._write_data(data):
+            self._mark_clean()
+
     def save_data(self):
         """將使用者資料儲存到檔案 (簡單的資料持久化)。"""
+        if self._in_batch:
+            return
         data = {user_id: user.to_dict() for user_id, user in self.users.items()}
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=4)
-        except IOError as e:
-            print(f"儲存資料失敗: {e}")
+        if self._write_data(data):
+            self._mark_clean()
 
     def load_data(self):
         """從檔案載入使用者資料。"""
         try:
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
+            with open(self.data_file, 'rb') as f:
+                data = _loads(f.read())
                 self.users = {user_id: User.from_dict(user_data) for user_id, user_data in data.items()}
         except FileNotFoundError:
             print("使用者資料檔案未找到，將創建一個新的。")
@@ -298,21 +468,23 @@ class SmartNoteApp:
             print("使用者資料檔案格式錯誤，將創建一個新的。")
             self.users = {}
 
-    def get_user_available_time(self):
-        """獲取使用者一周每天可用的讀書時間。"""
+    def get_user_available_time(self, available_time=None):
+        """獲取使用者一周每天可用的讀書時間。若已提供 available_time (例如腳本呼叫) 則直接使用，不詢問。"""
+        if available_time is not None:
+            return available_time
         available_time = {}
         days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
         for day in days:
             while True:
-                try:
-                    hours = int(input(f"請輸入您{day}可用的讀書時數："))
-                    if 0 <= hours <= 24:
-                        available_time[day] = hours
-                        break
-                    else:
-                        print("請輸入 0 到 24 之間的有效時數。")
-                except ValueError:
+                s = input(f"請輸入您{day}可用的讀書時數：").strip()
+                # 只接受不帶正負號的十進位數字；"+5"、"1_0" 雖然 int() 能解析，也視為無效
+                if not s.isdecimal():
                     print("輸入無效，請輸入一個數字。")
+                elif (hours := int(s)) <= 24:
+                    available_time[day] = hours
+                    break
+                else:
+                    print("請輸入 0 到 24 之間的有效時數。")
         return available_time
 
     def get_study_time_for_subject(self, available_time, important_subjects):
@@ -327,20 +499,15 @@ class SmartNoteApp:
             dict: A dictionary containing the study time for each subject, распределенное по дням.
                   Если important_subjects пуст, возвращает словарь с нулевым временем для каждого дня.
         """
-        study_time_per_subject = {}
         if not important_subjects:
-            for day in available_time:
-                study_time_per_subject[day] = 0
-            return study_time_per_subject
+            return dict.fromkeys(available_time, 0)
 
         total_available_time = sum(available_time.values())
         hours_per_subject = total_available_time / len(important_subjects)
 
-        for day, hours in available_time.items():
-            # Distribute time, ensuring no negative values
-            study_time_per_subject[day] = min(hours, hours_per_subject)
-
-        return study_time_per_subject
+        # Distribute time, capping each day at hours_per_subject (inline compare avoids a min() call per day)
+        return {day: hours_per_subject if hours_per_subject < hours else hours
+                for day, hours in available_time.items()}
     
 # --- 測試程式 ---
 if __name__ == "__main__":
@@ -351,11 +518,12 @@ if __name__ == "__main__":
     user1 = app.register_user("student123", "小明")
     print(f"註冊使用者：{user1.name} (ID: {user1.user_id})")
 
-    # 新增筆記
-    app.add_note("student123", "數學", "今天學了微積分的基本定理，需要多練習相關題目。")
-    app.add_note("student123", "數學", "複習了三角函數的公式。")
-    app.add_note("student123", "物理", "學習了牛頓三大運動定律。")  # 新增物理筆記
-    app.add_note("student123", "英文", "學習了現在完成式的用法。")  # 新增英文筆記
+    # 新增筆記 (批次寫入，結束時只存檔一次)
+    with app.batch():
+        app.add_note("student123", "數學", "今天學了微積分的基本定理，需要多練習相關題目。")
+        app.add_note("student123", "數學", "複習了三角函數的公式。")
+        app.add_note("student123", "物理", "學習了牛頓三大運動定律。")  # 新增物理筆記
+        app.add_note("student123", "英文", "學習了現在完成式的用法。")  # 新增英文筆記
 
     # 取得數學筆記
     math_notes = app.get_notes("student123", "數學")
@@ -420,7 +588,7 @@ if __name__ == "__main__":
     print("\n即將到來的任務：")
     if upcoming_tasks:
         for task, details in upcoming_tasks.items():
-            print(f"{task}: Deadline - {datetime.datetime.fromisoformat(details['deadline']).strftime('%Y-%m-%d %H:%M')}, Details - {details['details']}")
+            print(f"{task}: Deadline - {datetime.datetime.fromisoformat(details.deadline).strftime('%Y-%m-%d %H:%M')}, Details - {details.details}")
     else:
         print("沒有即將到來的任務。")
 